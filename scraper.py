@@ -1,8 +1,16 @@
 import os
-import requests
+import json
+import asyncio
+import hashlib
+import httpx
 import logging
 import random
-from playwright.sync_api import sync_playwright, TimeoutError
+import re
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError
 
 # --- Configuration ---
 # Set up basic logging to see the script's progress in GitHub Actions logs
@@ -12,160 +20,584 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 BHOOMI_URL = "https://landrecords.karnataka.gov.in/service60/"
 
 # --- IMPORTANT: Set the values for the dropdowns you want to query ---
-# The values MUST match the text in the dropdowns exactly.
-DISTRICT_NAME = "ಚಾಮರಾಜನಗರ"
-TALUK_NAME = "ಕೊಳ್ಳೇಗಾಲ (ಹನೂರು)"
-HOBLI_NAME = "ಹನೂರು"
-VILLAGE_NAME = "ಹುಲ್ಲೇಪುರ"
+# The values MUST match the text in the dropdowns exactly. Add one entry per village.
+VILLAGES = [
+    {
+        "district": "ಚಾಮರಾಜನಗರ",
+        "taluk": "ಕೊಳ್ಳೇಗಾಲ (ಹನೂರು)",
+        "hobli": "ಹನೂರು",
+        "village": "ಹುಲ್ಲೇಪುರ",
+    },
+]
 
 # Telegram configuration will be read from environment variables (GitHub Secrets)
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-SCREENSHOT_FILE = "error_screenshot.png"
+SCREENSHOT_FILE = "error_screenshot_{}.jpg" # Filled with the village's position in VILLAGES
+MESSAGE_SEPARATOR = r"\-" * 38 # Line printed between records in the Telegram report (escaped for MarkdownV2)
+
+# Characters that Telegram's MarkdownV2 treats as markup and that must be escaped in plain text
+MARKDOWN_SPECIAL_CHARS = re.compile(r"([_*\[\]()~`>#+\-=|{}.!\\])")
+
+# Files that should survive between runs live here (restored by actions/cache in the workflow)
+CACHE_DIR = Path(os.getenv("BHOOMI_CACHE_DIR", Path.home() / ".cache" / "bhoomi"))
+PROXY_CACHE_FILE = CACHE_DIR / "proxies.json"
+PROXY_CACHE_TTL = 1800 # Seconds before the cached proxy list is fetched again
+PROXY_SCORES_DB = CACHE_DIR / "proxy_scores.sqlite3"
+PROXY_DEAD_FAILURES = 3 # Proxies that failed this often without ever working are skipped
+PROXY_SCORE_MAX_AGE = 30 * 24 * 3600 # Seconds before an unused proxy's score is forgotten
+STORAGE_STATE_FILE = CACHE_DIR / "storage_state.json"
+STORAGE_STATE_TTL = 7 * 24 * 3600 # Seconds before saved cookies are ignored and the site is visited fresh
+TABLE_HASHES_FILE = CACHE_DIR / "table_hashes.json" # Last reported table digest per village
+
+# A quick HEAD request to the site before the browser navigates, so a dead route fails in seconds
+PREFLIGHT_TIMEOUT = 10
+GOTO_TIMEOUT = 30000 # ms; pre-flight already confirmed the site answers on this route
+
+# Cheap endpoint used to check that a proxy is alive before handing it to the browser
+PROXY_PROBE_URL = "https://www.google.com/generate_204"
+PROXY_PROBE_LIMIT = 50 # How many of the shuffled proxies to probe per run
+
+# Telegram responses worth retrying (rate limits and server errors) and how often to retry them
+TELEGRAM_RETRY_STATUSES = {429, 500, 502, 503, 504}
+TELEGRAM_MAX_RETRIES = 3
+
+# Set BHOOMI_LOG_XHR=1 to log the form's backend calls (method, URL, payload)
+LOG_XHR = os.getenv("BHOOMI_LOG_XHR") == "1"
+
+# Flags that suit headless Chromium on a Linux CI runner
+CHROMIUM_ARGS = [
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+    "--disable-gpu",
+    "--disable-blink-features=AutomationControlled",
+]
+
+# CSS selectors for the results table (Chromium resolves CSS faster than XPath)
+TABLE_SEL = "div#transland table"
+ROW_SEL = "div#transland table tbody tr"
+
+# Decorative assets that are not needed to read the mutations table
+BLOCKED_RESOURCE_TYPES = {"image", "font", "stylesheet", "media"}
+
+# Playwright error messages that mean the route to the site failed, not the page itself
+NETWORK_ERROR_MARKERS = ("net::ERR_",)
+
+class RetryableError(Exception):
+    """Raised when a strategy could not load the form on its route and the next, costlier strategy should be tried."""
+
+class SiteUnreachableError(RetryableError):
+    """Raised when the Bhoomi site does not answer on a route, or on any route at all."""
+
+class SiteBlockedError(RetryableError):
+    """Raised when the site answers on a route but serves an error or challenge page instead of the form."""
+
+def load_cached_proxies(max_age=None):
+    """Returns the cached proxy list, or None if it is missing, unreadable or older than max_age seconds."""
+    try:
+        if max_age is not None and time.time() - PROXY_CACHE_FILE.stat().st_mtime >= max_age:
+            return None
+        return json.loads(PROXY_CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+
+def load_storage_state():
+    """Returns the browser storage saved by the last successful run, or None if it is missing, stale or unreadable."""
+    try:
+        if time.time() - STORAGE_STATE_FILE.stat().st_mtime >= STORAGE_STATE_TTL:
+            return None
+        state = json.loads(STORAGE_STATE_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or "cookies" not in state:
+        return None
+    return state
+
+async def save_storage_state(context):
+    """Saves the context's cookies and local storage so the next run can start warm."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    await context.storage_state(path=STORAGE_STATE_FILE)
+
+def table_digest(headers, rows):
+    """Returns a SHA-256 of the table contents, used to tell whether anything changed since the last run."""
+    return hashlib.sha256(json.dumps([headers, rows], ensure_ascii=False).encode()).hexdigest()
+
+def load_table_hashes():
+    """Returns the saved {village key: table digest} map, or an empty one if it is missing or unreadable."""
+    try:
+        return json.loads(TABLE_HASHES_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def save_table_hash(location_key, digest):
+    """Records the digest of the table that was last reported for a village."""
+    hashes = load_table_hashes()
+    hashes[location_key] = digest
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    TABLE_HASHES_FILE.write_text(json.dumps(hashes, ensure_ascii=False))
+
+async def get_free_proxies(client):
+    """Fetches a list of free proxies from a public API, reusing a recent cached copy if there is one."""
+    proxies = load_cached_proxies(max_age=PROXY_CACHE_TTL)
+    if proxies:
+        random.shuffle(proxies) # Shuffle to try different proxies each run
+        logging.info(f"Using {len(proxies)} cached proxies from {PROXY_CACHE_FILE}.")
+        return proxies
 
-def get_free_proxies():
-    """Fetches a list of free proxies from a public API."""
     logging.info("Fetching a list of free proxies...")
     try:
         # Using a reliable public API for free proxies
-        response = requests.get("https://api.proxyscrape.com/v2/?request=getproxies&protocol=http&timeout=10000&country=all&ssl=all&anonymity=all", timeout=20)
+        response = await client.get("https://api.proxyscrape.com/v2/?request=getproxies&protocol=http&timeout=10000&country=all&ssl=all&anonymity=all", timeout=20)
         if response.status_code == 200:
             proxies = response.text.strip().split("\r\n")
             random.shuffle(proxies) # Shuffle to try different proxies each run
             logging.info(f"Successfully fetched {len(proxies)} proxies.")
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            PROXY_CACHE_FILE.write_text(json.dumps(proxies))
             return proxies
-    except requests.RequestException as e:
+    except httpx.RequestError as e:
         logging.error(f"Could not fetch proxies: {e}")
+
+    # An old list is better than none when the proxy API is down
+    proxies = load_cached_proxies()
+    if proxies:
+        random.shuffle(proxies)
+        logging.warning(f"Falling back to {len(proxies)} stale cached proxies.")
+        return proxies
     return []
 
-def send_telegram_message(message_text):
-    """Sends a message to the configured Telegram chat."""
+def open_proxy_scores():
+    """Opens the SQLite scoreboard of past Bhoomi page loads (successes, failures, load times) per proxy."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    scores = sqlite3.connect(PROXY_SCORES_DB)
+    scores.execute(
+        "CREATE TABLE IF NOT EXISTS proxies "
+        "(proxy TEXT PRIMARY KEY, ok INT NOT NULL DEFAULT 0, fail INT NOT NULL DEFAULT 0, last_ms REAL, ts INT)"
+    )
+    scores.execute("DELETE FROM proxies WHERE ts < ?", (int(time.time()) - PROXY_SCORE_MAX_AGE,))
+    scores.commit()
+    return scores
+
+def record_proxy_result(scores, proxy_server, ok, elapsed_ms=None):
+    """Adds one Bhoomi page-load success or failure to a proxy's score, keeping its latest load time."""
+    scores.execute(
+        "INSERT INTO proxies (proxy, ok, fail, last_ms, ts) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(proxy) DO UPDATE SET ok = ok + excluded.ok, fail = fail + excluded.fail, "
+        "last_ms = COALESCE(excluded.last_ms, last_ms), ts = excluded.ts",
+        (proxy_server, int(ok), int(not ok), elapsed_ms, int(time.time())),
+    )
+    scores.commit()
+
+def rank_proxies(scores, proxies):
+    """Orders proxies by past success rate, then failure count and latency, dropping ones that have only ever failed."""
+    known = {proxy: (ok, fail, last_ms) for proxy, ok, fail, last_ms in scores.execute("SELECT proxy, ok, fail, last_ms FROM proxies")}
+
+    def is_dead(proxy_server):
+        ok, fail, _ = known.get(proxy_server, (0, 0, None))
+        return ok == 0 and fail >= PROXY_DEAD_FAILURES
+
+    def score(proxy_server):
+        ok, fail, last_ms = known.get(proxy_server, (0, 0, None))
+        # Failures break ties, so a proxy that failed recently ranks below an untested one
+        return (-ok / (ok + fail + 1), fail, last_ms if last_ms is not None else float("inf"))
+
+    # sorted() is stable, so proxies without history keep their shuffled order
+    return sorted((proxy for proxy in proxies if not is_dead(proxy)), key=score)
+
+async def probe_proxy(proxy_server):
+    """Returns the probe latency in ms if a cheap request through the proxy succeeds, otherwise None."""
+    started = time.monotonic()
+    try:
+        async with httpx.AsyncClient(proxy=f"http://{proxy_server}", timeout=5) as probe_client:
+            response = await probe_client.get(PROXY_PROBE_URL)
+        if response.status_code == 204:
+            return (time.monotonic() - started) * 1000
+    except httpx.HTTPError:
+        pass
+    return None
+
+async def find_working_proxies(proxies):
+    """Probes proxies concurrently and returns the responsive ones, fastest first."""
+    # Probe results are not scored: reaching the probe URL says nothing about whether
+    # Bhoomi accepts the proxy, so only real page loads go into the scoreboard
+    candidates = proxies[:PROXY_PROBE_LIMIT]
+    logging.info(f"Probing {len(candidates)} proxies...")
+    # A malformed list entry (e.g. "1.2.3.4:abc") raises outside httpx.HTTPError; count it as a failed probe
+    results = await asyncio.gather(*(probe_proxy(proxy_server) for proxy_server in candidates), return_exceptions=True)
+    latencies = [None if isinstance(result, Exception) else result for result in results]
+    responded = sorted((elapsed_ms, proxy_server) for proxy_server, elapsed_ms in zip(candidates, latencies) if elapsed_ms is not None)
+    working = [proxy_server for _, proxy_server in responded]
+    logging.info(f"{len(working)} of {len(candidates)} proxies responded.")
+    return working
+
+def escape_markdown(text):
+    """Escapes text so Telegram's MarkdownV2 parser shows it literally."""
+    return MARKDOWN_SPECIAL_CHARS.sub(r"\\\1", text)
+
+def split_line(line, limit):
+    """Cuts a line into pieces of at most limit characters without separating a backslash from the character it escapes."""
+    pieces = []
+    while len(line) > limit:
+        cut = limit
+        # An odd run of backslashes before the cut means the last one escapes the next character
+        backslashes = len(line[:cut]) - len(line[:cut].rstrip("\\"))
+        if backslashes % 2:
+            cut -= 1
+        pieces.append(line[:cut])
+        line = line[cut:]
+    return pieces + [line]
+
+def split_message(message_text, limit):
+    """Splits text into chunks of at most limit characters, breaking between lines so markup stays intact."""
+    chunks, lines, size = [], [], 0
+    for line in message_text.split("\n"):
+        # Only a single line longer than the limit has to be cut mid-line
+        for piece in split_line(line, limit):
+            if lines and size + 1 + len(piece) > limit:
+                chunks.append("\n".join(lines))
+                lines, size = [], 0
+            size += len(piece) + (1 if lines else 0)
+            lines.append(piece)
+    chunks.append("\n".join(lines))
+    return [chunk for chunk in chunks if chunk.strip()] # Telegram rejects empty messages
+
+async def preflight(proxy_server=None):
+    """Returns True if a HEAD request (through the proxy, if given) gets any answer from the Bhoomi site."""
+    proxy = f"http://{proxy_server}" if proxy_server else None
+    try:
+        async with httpx.AsyncClient(proxy=proxy, timeout=PREFLIGHT_TIMEOUT, verify=False) as preflight_client:
+            await preflight_client.head(BHOOMI_URL)
+        return True
+    except httpx.HTTPError:
+        return False
+
+async def _post_chunk(client, chunk, delay=0):
+    """Posts a single message chunk to the configured Telegram chat, retrying rate limits and server errors."""
+    await asyncio.sleep(delay)
+    payload = {
+        'chat_id': TELEGRAM_CHAT_ID,
+        'text': chunk,
+        'parse_mode': 'MarkdownV2'
+    }
+    for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+        try:
+            response = await client.post(TELEGRAM_API_URL, data=payload)
+        except httpx.RequestError as e:
+            logging.error(f"An error occurred while sending Telegram message: {e}")
+            return False
+        if response.status_code in TELEGRAM_RETRY_STATUSES and attempt < TELEGRAM_MAX_RETRIES:
+            # Telegram sends Retry-After on 429; otherwise back off exponentially
+            await asyncio.sleep(float(response.headers.get("Retry-After", 0.3 * 2 ** attempt)))
+            continue
+        if response.status_code != 200:
+            logging.error(f"Failed to send Telegram message. Status: {response.status_code}, Response: {response.text}")
+            return False
+        return True
+
+async def send_telegram_message(client, message_text):
+    """Sends a message to the configured Telegram chat. Returns True if every part was delivered."""
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
         logging.error("Telegram credentials are not set. Cannot send message.")
-        return
+        return False
 
     # Telegram has a message size limit of 4096 characters.
-    for i in range(0, len(message_text), 4096):
-        chunk = message_text[i:i + 4096]
-        payload = {
-            'chat_id': TELEGRAM_CHAT_ID,
-            'text': chunk,
-            'parse_mode': 'Markdown'
-        }
-        try:
-            response = requests.post(TELEGRAM_API_URL, data=payload, timeout=10)
-            if response.status_code != 200:
-                logging.error(f"Failed to send Telegram message. Status: {response.status_code}, Response: {response.text}")
-        except requests.RequestException as e:
-            logging.error(f"An error occurred while sending Telegram message: {e}")
+    # Multi-part messages are sent concurrently and may arrive out of order, so each
+    # part is numbered; 16 characters are kept free for the "(n/total)" prefix.
+    chunks = split_message(message_text, 4096)
+    if len(chunks) > 1:
+        chunks = split_message(message_text, 4080)
+        chunks = [f"\\({n}/{len(chunks)}\\)\n{chunk}" for n, chunk in enumerate(chunks, start=1)]
 
-def scrape_bhoomi_data():
-    """Launches a browser, navigates the site, scrapes data, and sends it."""
-    proxies = get_free_proxies()
-    if not proxies:
-        send_telegram_message("❌ *Bhoomi Bot Error*: Could not fetch any proxies to use. Aborting run.")
-        return
+    # Start each part 50 ms after the previous one to stay well under Telegram's 30 messages/second limit
+    results = await asyncio.gather(*(_post_chunk(client, chunk, delay=0.05 * n) for n, chunk in enumerate(chunks)))
+    return all(results)
+
+def is_ajax_response(response):
+    """Matches the successful XHR/fetch responses the form uses to fill its dropdowns."""
+    return response.request.resource_type in ("xhr", "fetch") and response.ok
 
+def log_ajax_request(request):
+    """Logs an XHR/fetch request so the form's backend calls can be recorded."""
+    if request.resource_type in ("xhr", "fetch"):
+        logging.info(f"XHR {request.method} {request.url} {request.post_data}")
+
+async def block_static_assets(route):
+    """Aborts requests for images, fonts, stylesheets and media; lets everything else through."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+def is_retryable(error):
+    """Tells page-load timeouts and connection failures, which another route may avoid, apart from real page errors."""
+    if isinstance(error, TimeoutError):
+        return True
+    return isinstance(error, PlaywrightError) and any(marker in str(error) for marker in NETWORK_ERROR_MARKERS)
+
+async def fill_form(page, location):
+    """Selects the village's district, taluk, hobli and village and submits the form."""
+    logging.info(f"Selecting District: {location['district']}")
+    async with page.expect_response(is_ajax_response, timeout=20000):
+        await page.locator("select#district").select_option(label=location["district"])
+
+    logging.info(f"Selecting Taluk: {location['taluk']}")
+    async with page.expect_response(is_ajax_response, timeout=20000):
+        await page.locator("select#taluk").select_option(label=location["taluk"], timeout=20000)
+
+    logging.info(f"Selecting Hobli: {location['hobli']}")
+    async with page.expect_response(is_ajax_response, timeout=20000):
+        await page.locator("select#hobli").select_option(label=location["hobli"], timeout=20000)
+
+    # select_option waits until the requested option has been rendered,
+    # so the village list needs no extra wait after the hobli response.
+    logging.info(f"Selecting Village: {location['village']}")
+    await page.locator("select#village").select_option(label=location["village"], timeout=20000)
+
+    # The click may submit via XHR or a full postback; extract_table waits for the rows either way
+    logging.info("Clicking 'Fetch Details' button...")
+    await page.locator('button:has-text("Fetch Details")').click()
+
+async def scrape_form(browser, scores, location, screenshot_file, proxy_server=None, stealth=None):
+    """Runs the whole form scrape for one village on one route and returns (headers, rows)."""
+    # Only route problems (no answer, an error or challenge page) are raised as RetryableError
+    # so the caller can try another route. Once the form has loaded, anything that goes wrong
+    # (e.g. a village label missing from a dropdown) belongs to this village and bubbles up unchanged.
+    via = f"proxy {proxy_server}" if proxy_server else "a direct connection"
+    if not await preflight(proxy_server):
+        if proxy_server:
+            record_proxy_result(scores, proxy_server, False)
+        raise SiteUnreachableError(f"{BHOOMI_URL} did not answer the pre-flight via {via}.")
+
+    storage_state = load_storage_state()
+    try:
+        return await scrape_page(browser, scores, location, screenshot_file, proxy_server, stealth, storage_state)
+    except SiteBlockedError:
+        if storage_state is None:
+            raise
+        # Replayed cookies can themselves earn an error page, and every route would replay
+        # them; drop the saved state and retry this route once with a fresh session
+        logging.warning(f"Blocked via {via} while replaying saved browser state. Discarding it and retrying.")
+        STORAGE_STATE_FILE.unlink(missing_ok=True)
+        return await scrape_page(browser, scores, location, screenshot_file, proxy_server, stealth, None)
+
+async def scrape_page(browser, scores, location, screenshot_file, proxy_server, stealth, storage_state):
+    """Loads the form in a fresh browser context on one route, fills it in and returns (headers, rows)."""
+    via = f"proxy {proxy_server}" if proxy_server else "a direct connection"
+    started = time.monotonic()
+    context_options = {
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
+        "ignore_https_errors": True, # Important for some proxies
+        "viewport": {"width": 1024, "height": 768},
+        "storage_state": storage_state,
+    }
+    if proxy_server:
+        context_options["proxy"] = {"server": f"http://{proxy_server}"}
+    context = await browser.new_context(**context_options)
     page = None
-    browser = None
-    context = None
-    
-    with sync_playwright() as p:
-        # Try up to 10 different proxies before giving up
-        for i, proxy_server in enumerate(proxies[:10]):
-            try:
-                logging.info(f"Attempt {i+1}/10: Trying with proxy: {proxy_server}")
-                browser = p.firefox.launch(
-                    headless=True,
-                    proxy={"server": f"http://{proxy_server}"}
-                )
-                context = browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0",
-                    ignore_https_errors=True # Important for some proxies
-                )
-                page = context.new_page()
-
-                logging.info(f"Navigating to {BHOOMI_URL} via proxy...")
-                page.goto(BHOOMI_URL, timeout=90000, wait_until='domcontentloaded')
-                
-                # If we reach here, the connection was successful
-                logging.info("Successfully connected to the website through the proxy.")
-                break # Exit the loop and proceed with scraping
-
-            except Exception as e:
-                logging.warning(f"Proxy {proxy_server} failed: {e.__class__.__name__}. Trying next proxy.")
-                if browser:
-                    browser.close()
-                if (i + 1) == 10: # If it was the last attempt
-                    # Re-raise the last exception to fail the workflow
-                    raise e
-
-        # --- The rest of the script runs only if a connection was successful ---
+    loaded = False
+    try:
+        await context.route("**/*", block_static_assets)
+        page = await context.new_page()
+        if stealth:
+            await stealth(page)
+        if LOG_XHR:
+            page.on("request", log_ajax_request)
+
         try:
-            # --- Interacting with the Form ---
-            logging.info(f"Selecting District: {DISTRICT_NAME}")
-            page.locator("select#district").select_option(label=DISTRICT_NAME)
-            page.wait_for_load_state('networkidle', timeout=20000)
-
-            logging.info(f"Selecting Taluk: {TALUK_NAME}")
-            page.locator("select#taluk").select_option(label=TALUK_NAME)
-            page.wait_for_load_state('networkidle', timeout=20000)
-
-            logging.info(f"Selecting Hobli: {HOBLI_NAME}")
-            page.locator("select#hobli").select_option(label=HOBLI_NAME)
-            page.wait_for_load_state('networkidle', timeout=20000)
-
-            logging.info(f"Selecting Village: {VILLAGE_NAME}")
-            page.locator("select#village").select_option(label=VILLAGE_NAME)
-            page.wait_for_load_state('networkidle', timeout=10000)
-
-            logging.info("Clicking 'Fetch Details' button...")
-            page.locator('button:has-text("Fetch Details")').click()
-
-            # --- Scraping the Results Table ---
-            logging.info("Waiting for transaction details table to load...")
-            table_selector = '//div[@id="transland"]//table/tbody/tr'
-            page.wait_for_selector(table_selector, timeout=60000)
-
-            rows = page.locator(table_selector).all()
-            if not rows:
-                logging.info("No transaction data found for the selected criteria.")
-                send_telegram_message(f"✅ Bhoomi Bot: No new transaction data found for {VILLAGE_NAME} village.")
-                return
-
-            logging.info(f"Found {len(rows)} transaction(s). Formatting message...")
-            header_elements = page.locator('//div[@id="transland"]//table/thead/tr/th').all()
-            headers = [h.inner_text().strip() for h in header_elements]
-
-            message_lines = [f"📄 *Bhoomi Mutation Status for {VILLAGE_NAME}*"]
-            message_lines.append("--------------------------------------")
-
-            for row in rows:
-                cells = row.locator('td').all()
-                record_details = [f"*{headers[i+1]}*: {cells[i+1].inner_text().strip()}" for i in range(len(headers)-1)]
-                message_lines.append("\n".join(record_details))
-                message_lines.append("--------------------------------------")
-
-            final_message = "\n".join(message_lines)
-            send_telegram_message(final_message)
-            logging.info("Successfully sent data to Telegram.")
+            logging.info(f"Navigating to {BHOOMI_URL} via {via}...")
+            response = await page.goto(BHOOMI_URL, timeout=GOTO_TIMEOUT, wait_until='domcontentloaded')
+            loaded = True
 
+            # A blocked route usually still loads, just with a 403 or a challenge page instead of the form
+            if response is None or response.status >= 400:
+                status = response.status if response else "no response"
+                raise SiteBlockedError(f"{BHOOMI_URL} answered via {via} with HTTP {status}.")
+            try:
+                await page.locator("select#district").wait_for(state="attached", timeout=20000)
+            except TimeoutError as e:
+                raise SiteBlockedError(f"{BHOOMI_URL} loaded via {via} but the form is missing.") from e
         except Exception as e:
-            error_message = f"An error occurred after connecting: {e.__class__.__name__}. Check logs."
-            logging.error(f"An unexpected error occurred: {e}", exc_info=True)
-            if page:
-                logging.info(f"Saving screenshot to {SCREENSHOT_FILE}")
-                page.screenshot(path=SCREENSHOT_FILE, full_page=True)
-            send_telegram_message(f"❌ *Bhoomi Bot Error*: {error_message}. A screenshot was saved to the GitHub Actions artifacts.")
+            if proxy_server:
+                record_proxy_result(scores, proxy_server, False)
+            if is_retryable(e):
+                raise SiteUnreachableError(f"Could not load {BHOOMI_URL} via {via}: {e.__class__.__name__}.") from e
             raise
-        finally:
-            if browser:
-                logging.info("Closing browser.")
-                browser.close()
+
+        logging.info(f"Successfully connected to the website via {via}.")
+        if proxy_server:
+            record_proxy_result(scores, proxy_server, True, (time.monotonic() - started) * 1000)
+
+        await fill_form(page, location)
+
+        logging.info("Waiting for transaction details table to load...")
+        headers, rows = await extract_table(page)
+        await save_storage_state(context)
+        return headers, rows
+
+    except Exception:
+        # Only a page that actually loaded is worth a screenshot; this keeps the latest attempt's
+        if loaded:
+            logging.info(f"Saving screenshot to {screenshot_file}")
+            try:
+                # A viewport-only JPEG is quick to encode even when the page is misbehaving
+                await page.screenshot(path=screenshot_file, type="jpeg", quality=60, full_page=False, timeout=10000)
+            except Exception as screenshot_error:
+                logging.warning(f"Could not save screenshot: {screenshot_error}")
+        raise
+    finally:
+        await context.close()
+
+async def direct_scrape(browser, client, scores, run, location, screenshot_file):
+    """Cheapest strategy: a plain headless browser on the runner's own connection."""
+    try:
+        return await scrape_form(browser, scores, location, screenshot_file)
+    except SiteBlockedError:
+        # The site answered but refused the browser, which is the one case stealth patches can fix
+        run["direct_blocked"] = True
+        raise
+
+async def stealth_scrape(browser, client, scores, run, location, screenshot_file):
+    """A direct connection with playwright-stealth patches, for when the site blocks plain headless browsers."""
+    if not run["direct_blocked"]:
+        raise RetryableError("The direct route was not blocked, so stealth patches would not help.")
+    try:
+        from playwright_stealth import stealth_async # Optional dependency, only this strategy needs it
+    except ImportError as e:
+        raise RetryableError("playwright-stealth is not installed.") from e
+    return await scrape_form(browser, scores, location, screenshot_file, stealth=stealth_async)
+
+async def proxied_scrape(browser, client, scores, run, location, screenshot_file):
+    """Costliest strategy: routes the browser through the best-ranked responsive free proxies."""
+    # Fetch, probe and rank the proxies once per run
+    if run["proxies"] is None:
+        proxies = await get_free_proxies(client)
+        # Probe the historically best proxies first, then try the survivors best-first
+        run["proxies"] = rank_proxies(scores, await find_working_proxies(rank_proxies(scores, proxies)))
+    proxies = run["proxies"]
+    if not proxies:
+        raise RetryableError("No responsive proxies are left for this run.")
+
+    # The proxy that worked for the previous village stays at the front; failed ones are
+    # dropped for the rest of the run. Try up to 10 different proxies before giving up.
+    for attempt in range(1, 11):
+        if not proxies:
+            break
+        proxy_server = proxies[0]
+        logging.info(f"Attempt {attempt}/10: Trying with proxy: {proxy_server}")
+        try:
+            return await scrape_form(browser, scores, location, screenshot_file, proxy_server=proxy_server)
+        except RetryableError as e:
+            logging.warning(f"{e} Trying next proxy.")
+            proxies.pop(0)
+    raise RetryableError(f"No proxy could scrape {BHOOMI_URL}.")
+
+# Tried in increasing order of cost; the first one that scrapes the form wins
+STRATEGIES = [direct_scrape, stealth_scrape, proxied_scrape]
+
+async def scrape_with_strategies(browser, client, scores, run, location, screenshot_file):
+    """Scrapes one village with the cheapest strategy that still works in this run."""
+    for i in range(run["strategy"], len(STRATEGIES)):
+        strategy = STRATEGIES[i]
+        logging.info(f"Trying strategy: {strategy.__name__}")
+        try:
+            result = await strategy(browser, client, scores, run, location, screenshot_file)
+        except RetryableError as e:
+            logging.warning(f"Strategy {strategy.__name__} failed: {e}")
+            # Later villages skip a strategy that already failed, but the proxied one keeps
+            # its remaining proxies and is always tried
+            run["strategy"] = min(i + 1, len(STRATEGIES) - 1)
+            continue
+        run["strategy"] = i
+        return result
+    raise SiteUnreachableError(f"No strategy could scrape {BHOOMI_URL}.")
+
+async def extract_table(page):
+    """Returns the results table as (headers, rows) of plain strings, without the leading index column."""
+    # 'attached' skips the visibility computation the default 'visible' state needs
+    results_table = page.locator(TABLE_SEL).first
+    await results_table.wait_for(state="attached", timeout=60000)
+    try:
+        await page.locator(ROW_SEL).first.wait_for(state="attached", timeout=5000)
+    except TimeoutError:
+        # A results table that stays empty means the village has no transactions
+        logging.info("The results table has no rows.")
+
+    # Read the whole table in one round-trip instead of one inner_text() call per cell
+    table = await results_table.evaluate("""t => {
+        const texts = row => row ? [...row.cells].slice(1).map(c => c.innerText.trim()) : [];
+        return {headers: texts(t.tHead && t.tHead.rows[0]), rows: t.tBodies[0] ? [...t.tBodies[0].rows].map(texts) : []};
+    }""")
+    return table["headers"], table["rows"]
+
+def build_message(village_name, headers, rows):
+    """Formats the scraped table as a MarkdownV2 Telegram report."""
+    # One flat list of lines, joined once at the end
+    message_lines = [f"📄 *Bhoomi Mutation Status for {escape_markdown(village_name)}*", MESSAGE_SEPARATOR]
+    for cells in rows:
+        message_lines.extend(f"*{escape_markdown(header)}*: {escape_markdown(cell)}" for header, cell in zip(headers, cells))
+        message_lines.append(MESSAGE_SEPARATOR)
+    return "\n".join(message_lines)
+
+async def scrape_bhoomi_data(browser, client, scores, run, location, screenshot_file):
+    """Scrapes the form for one village and sends the result."""
+    village_name = location["village"]
+    try:
+        headers, rows = await scrape_with_strategies(browser, client, scores, run, location, screenshot_file)
+    except SiteUnreachableError:
+        await send_telegram_message(client, "❌ *Bhoomi Bot Error*: " + escape_markdown(f"No strategy (direct, stealth, proxied) could scrape {village_name}. Check logs and the GitHub Actions artifacts."))
+        raise
+    except Exception as e:
+        error_message = f"An error occurred while scraping {village_name}: {e.__class__.__name__}. Check logs."
+        logging.error(f"An unexpected error occurred: {e}", exc_info=True)
+        await send_telegram_message(client, "❌ *Bhoomi Bot Error*: " + escape_markdown(f"{error_message}. A screenshot was saved to the GitHub Actions artifacts."))
+        raise
+
+    # Only notify when the table differs from the last one delivered; the digest is
+    # saved after a successful send so a failed delivery is retried next run
+    location_key = "/".join(location[level] for level in ("district", "taluk", "hobli", "village"))
+    digest = table_digest(headers, rows)
+    if load_table_hashes().get(location_key) == digest:
+        logging.info("Transaction table is unchanged since the last run. Skipping Telegram message.")
+    elif not rows:
+        logging.info("No transaction data found for the selected criteria.")
+        if await send_telegram_message(client, escape_markdown(f"✅ Bhoomi Bot: No new transaction data found for {village_name} village.")):
+            save_table_hash(location_key, digest)
+    else:
+        logging.info(f"Found {len(rows)} transaction(s). Formatting message...")
+        if await send_telegram_message(client, build_message(village_name, headers, rows)):
+            logging.info("Successfully sent data to Telegram.")
+            save_table_hash(location_key, digest)
+
+async def main():
+    """Launches one browser and scrapes every configured village with it."""
+    # One HTTP/2 client multiplexes every Telegram call over a single connection
+    async with httpx.AsyncClient(http2=True, timeout=10) as client:
+        with closing(open_proxy_scores()) as scores:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+                # Per-run strategy choice shared by all villages: the index of the strategy to
+                # start from, whether the direct route was blocked, and the remaining proxies
+                run = {"strategy": 0, "direct_blocked": False, "proxies": None}
+                failed = []
+                try:
+                    for n, location in enumerate(VILLAGES, start=1):
+                        # One village failing (already logged and alerted) must not skip the rest
+                        try:
+                            await scrape_bhoomi_data(browser, client, scores, run, location, SCREENSHOT_FILE.format(n))
+                        except Exception:
+                            logging.warning(f"Village {location['village']} failed. Continuing with the next one.")
+                            failed.append(location["village"])
+                finally:
+                    logging.info("Closing browser.")
+                    await browser.close()
+
+    if failed:
+        # Fail the workflow so the screenshots are uploaded
+        raise RuntimeError(f"{len(failed)} of {len(VILLAGES)} villages failed: {', '.join(failed)}")
 
 if __name__ == "__main__":
     if not all([TELEGRAM_TOKEN, TELEGRAM_CHAT_ID]):
         logging.error("CRITICAL ERROR: TELEGRAM_TOKEN and TELEGRAM_CHAT_ID environment variables must be set in GitHub Secrets.")
     else:
-        scrape_bhoomi_data()
+        asyncio.run(main())